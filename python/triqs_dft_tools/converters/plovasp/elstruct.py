@@ -145,7 +145,7 @@ class ElectronicStructure:
         """
         plo = self.proj_raw
         nproj, ns, nk, nb = plo.shape
-        ions = sorted(list(set([param['isite'] for param in self.proj_params])))
+        ions = sorted(set(self.proj_params.isite_arr.tolist()))
         nions = len(ions)
         norb = nproj // nions
 
@@ -169,7 +169,8 @@ class ElectronicStructure:
                 print("  Spin:", ispin + 1)
                 for io, ion in enumerate(ions):
                     print("  Site:", ion)
-                    iorb_inds = [(ip, param['m']) for ip, param in enumerate(self.proj_params) if param['isite'] == ion]
+                    ips = np.flatnonzero(self.proj_params.isite_arr == ion)
+                    iorb_inds = list(zip(ips, self.proj_params.m_arr[ips]))
                     norb = len(iorb_inds)
                     dm = np.zeros((norb, norb))
                     ov = np.zeros((norb, norb))
@@ -205,7 +206,8 @@ class ElectronicStructure:
                 print("  Spin:", ispin + 1)
                 for io, ion in enumerate(ions):
                     print("  Site:", ion)
-                    iorb_inds = [(ip, param['m']) for ip, param in enumerate(self.proj_params) if param['isite'] == ion]
+                    ips = np.flatnonzero(self.proj_params.isite_arr == ion)
+                    iorb_inds = list(zip(ips, self.proj_params.m_arr[ips]))
                     norb = len(iorb_inds)
                     dm = np.zeros((norb, norb))
                     ov = np.zeros((norb, norb))
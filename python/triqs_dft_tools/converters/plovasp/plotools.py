@@ -93,11 +93,9 @@ def check_data_consistency(pars, el_struct):
 
 # Check that ion and orbital lists in shells match those of projectors
         lshell = sh['lshell']
+        proj_params = el_struct.proj_params
         for ion in ion_list:
-            for par in el_struct.proj_params:
-                if par['isite'] - 1 == ion and par['l'] == lshell:
-                    break
-            else:
+            if not np.any((proj_params.isite_arr - 1 == ion) & (proj_params.l_arr == lshell)):
                 errmsg = "Projector for isite = %s, l = %s does not match PROJCAR"%(ion + 1, lshell)
                 raise Exception(errmsg)
 
@@ -40,6 +40,7 @@ def issue_warning(message):
 import itertools as it
 import numpy as np
 from . import atm
+from .vaspio import ProjParams
 
 np.set_printoptions(suppress=True)
 
@@ -219,6 +220,20 @@ class ProjectorShell:
             nlm = self.lm2 - self.lm1
         else:
             nlm = 2*(self.lm2 - self.lm1)
+
+# Here we search for the indices of the projectors with the given isite/l/m
+# indices (-1 if there is no such projector); a list of dictionaries
+# is accepted as well
+        if not isinstance(proj_params, ProjParams):
+            proj_params = ProjParams.from_dicts(proj_params)
+        sel_l = proj_params.l_arr == self.lorb
+        ip_inds = -np.ones((len(self.ion_list), nlm), dtype=int)
+        for io, ion in enumerate(self.ion_list):
+            sel_ion = sel_l & (proj_params.isite_arr - 1 == ion)
+            for m in range(nlm):
+                ips = np.flatnonzero(sel_ion & (proj_params.m_arr == m))
+                if ips.size > 0:
+                    ip_inds[io, m] = ips[0]
         
         if self.do_transform:
             ndim = self.tmatrices.shape[1]
@@ -229,11 +244,9 @@ class ProjectorShell:
                     proj_k = np.zeros((ns, nlm, nb), dtype=np.complex128)
                     qcoord = structure['qcoords'][ion]
                     for m in range(nlm):
-# Here we search for the index of the projector with the given isite/l/m indices
-                        for ip, par in enumerate(proj_params):
-                            if par['isite'] - 1 == ion and par['l'] == self.lorb and par['m'] == m:
-                                proj_k[:, m, :] = proj_raw[ip, :, ik, :]  #* kphase
-                                break
+                        ip = ip_inds[io, m]
+                        if ip >= 0:
+                            proj_k[:, m, :] = proj_raw[ip, :, ik, :]  #* kphase
                     for isp in range(ns):
                         self.proj_arr[io, isp, ik, :, :] = np.dot(self.tmatrices[io, :, :], proj_k[isp, :, :])
 
@@ -242,12 +255,10 @@ class ProjectorShell:
             self.proj_arr = np.zeros((nion, ns, nk, nlm, nb), dtype=np.complex128)
             for io, ion in enumerate(self.ion_list):
                 qcoord = structure['qcoords'][ion]
-                for m in range(nlm):                    
-# Here we search for the index of the projector with the given isite/l/m indices
-                    for ip, par in enumerate(proj_params):
-                        if par['isite'] - 1 == ion and par['l'] == self.lorb and par['m'] == m:
-                            self.proj_arr[io, :, :, m, :] = proj_raw[ip, :, :, :]
-                            break            
+                for m in range(nlm):
+                    ip = ip_inds[io, m]
+                    if ip >= 0:
+                        self.proj_arr[io, :, :, m, :] = proj_raw[ip, :, :, :]
 
 ################################################################################
 #
@@ -36,23 +36,366 @@ r"""
       - IBZKPT
       - EIGENVAL
       - DOSCAR
+
+    Notes on performance: parsing of these files involves no arithmetic and
+    is dominated by tokenization of text. The parsers therefore first read
+    whole files (or blocks) at once and convert them with NumPy; loops over
+    individual numbers are compiled with Numba (if available) only for the
+    largest files, LOCPROJ and EIGENVAL. Before optimizing further, use
+    `_profile_parse()` to check where the time is actually spent.
 """
+import mmap
+import os
 import numpy as np
 import re
+import traceback
+import zipfile
+try:
+    from numba import njit, prange
+    _has_numba = True
+except ImportError:
+    prange = range
+    _has_numba = False
 #import plocar_io.c_plocar_io as c_plocar_io
 
-def read_lines(filename):
+# Precompiled patterns used by the parsers
+_ISITE_RE = re.compile(rb"^ *ISITE")
+_COMMENT_RE = re.compile(r"[!#].*")
+_SYMMCAR_PAR_RE = {parname: re.compile(parname + r"\s*=\s*(\d+)")
+                   for parname in ('NROT', 'NPCELL', 'LMAX', 'NION')}
+
+# Orbital labels used in LOCPROJ, ordered by the combined index lm = l*l + m,
+# and the corresponding map label -> (l, m)
+_ORB_LABELS = ["s", "py", "pz", "px", "dxy", "dyz", "dz2", "dxz", "dx2-y2",
+               "fy(3x2-y2)", "fxyz", "fyz2", "fz3", "fxz2", "fz(x2-y2)", "fx(x2-3y2)"]
+_ORB_L_M = {label: (int(np.sqrt(lm)), lm - int(np.sqrt(lm))**2)
+            for lm, label in enumerate(_ORB_LABELS)}
+
+def _read_bytes(filename, file_cache=None):
+    r"""
+    Reads the whole file at once and returns its content as bytes.
+
+    Parameters
+    ----------
+
+    filename (str) : name of the file
+    file_cache (dict) : if given, the content is stored in and taken from this
+                        dictionary, as long as the size and modification time
+                        of the file do not change
+    """
+    if file_cache is not None:
+        key = (os.path.getsize(filename), os.path.getmtime(filename))
+        cached = file_cache.get(filename)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+    with open(filename, 'rb') as f:
+        raw = f.read()
+
+    if file_cache is not None:
+        file_cache[filename] = (key, raw)
+    return raw
+
+def _slurp(filename, file_cache=None):
     r"""
-    Generator of lines for a file
+    Reads the whole file at once and returns a list of its lines
+    (without line terminators).
 
     Parameters
     ----------
 
     filename (str) : name of the file
+    file_cache (dict) : see `_read_bytes()`
+    """
+    return _read_bytes(filename, file_cache).decode().splitlines()
+
+def _line_starts(buf):
+    r"""
+    Returns offsets of the beginnings of all lines in the byte array 'buf',
+    followed by the size of the buffer, so that line 'i' is given by
+    'buf[starts[i]:starts[i+1]]'.
     """
-    with open(filename, 'r') as f:
-        for line in f:
-            yield line
+    starts = [[0], np.flatnonzero(buf == 10) + 1]
+    if buf.size > 0 and buf[-1] != 10:
+        starts.append([buf.size])
+    return np.concatenate(starts)
+
+def _count_tokens(buf, starts, chunk_size=1 << 20):
+    r"""
+    Returns the number of whitespace-separated tokens in each of the lines
+    'buf[starts[i]:starts[i+1]]' of the byte array 'buf'.
+
+    Lines are processed in chunks of about 'chunk_size' bytes, so that
+    temporary arrays do not scale with the size of the file.
+    """
+    nlines = starts.size - 1
+    counts = np.zeros(max(nlines, 0), dtype=np.int64)
+    i0 = 0
+    while i0 < nlines:
+        i1 = np.searchsorted(starts, starts[i0] + chunk_size, side='right') - 1
+        i1 = min(max(i1, i0 + 1), nlines)
+        region = buf[starts[i0]:starts[i1]]
+# A token starts at a non-whitespace byte preceded by whitespace
+        tok_start = region > 32
+        tok_start[1:] &= region[:-1] <= 32
+        tok = np.flatnonzero(tok_start)
+        counts[i0:i1] = np.diff(np.searchsorted(tok, starts[i0:i1 + 1] - starts[i0]))
+        i0 = i1
+    return counts
+
+# Powers of 10 that are exactly representable as doubles
+_POW10 = np.array([float(10**k) for k in range(23)])
+
+def _scan_float(buf, pos):
+    r"""
+    Parses a number from the byte array 'buf' starting at position 'pos'.
+    Leading whitespace is skipped.
+
+    Returns the number and the position right after it. The position is -1
+    if the end of the buffer is reached, and -2 if the next token is not
+    a plain decimal number (e.g. a word, 'NaN' or a Fortran 'D' exponent)
+    or if the number cannot be converted exactly by this function.
+    A negative 'pos' is returned unchanged, so that a sequence of calls can
+    be checked once at the end.
+
+    Digits are accumulated in an integer mantissa which is then scaled by a
+    power of 10. The mantissa keeps at most 15 significant digits (further
+    digits are accepted only if they are zeros), so that it is exactly
+    representable. If the decimal exponent is also within [-22, 22], both
+    factors are exact and a single operation gives the correctly rounded
+    result, identical to 'float()'. This covers all numbers written by VASP
+    to LOCPROJ and EIGENVAL. Anything else (more digits, larger exponents)
+    gives position -2 and must be converted by the caller in another way.
+    """
+    n = buf.size
+    if pos < 0:
+        return 0.0, pos
+
+    while pos < n and buf[pos] <= 32:
+        pos += 1
+    if pos == n:
+        return 0.0, -1
+
+    sign = 1.0
+    if pos < n and buf[pos] == 45: # '-'
+        sign = -1.0
+        pos += 1
+    elif pos < n and buf[pos] == 43: # '+'
+        pos += 1
+
+# Digits that do not fit in the mantissa are dropped; this is exact
+# only if they are zeros
+    mant = 0
+    exp10 = 0
+    ndigits = 0
+    exact = True
+    while pos < n and buf[pos] >= 48 and buf[pos] <= 57:
+        if mant < 900719925474099:
+            mant = mant * 10 + (int(buf[pos]) - 48)
+        else:
+            exp10 += 1
+            if buf[pos] != 48:
+                exact = False
+        ndigits += 1
+        pos += 1
+    if pos < n and buf[pos] == 46: # '.'
+        pos += 1
+        while pos < n and buf[pos] >= 48 and buf[pos] <= 57:
+            if mant < 900719925474099:
+                mant = mant * 10 + (int(buf[pos]) - 48)
+                exp10 -= 1
+            elif buf[pos] != 48:
+                exact = False
+            ndigits += 1
+            pos += 1
+    if ndigits == 0:
+        return 0.0, -2
+
+# Exponent
+    if pos < n and (buf[pos] | 32) == 101: # 'E' or 'e'
+        pos += 1
+        esign = 1
+        if pos < n and buf[pos] == 45:
+            esign = -1
+            pos += 1
+        elif pos < n and buf[pos] == 43:
+            pos += 1
+        e = 0
+        edigits = 0
+        while pos < n and buf[pos] >= 48 and buf[pos] <= 57:
+            if e < 100000:
+                e = e * 10 + (int(buf[pos]) - 48)
+            edigits += 1
+            pos += 1
+        if edigits == 0:
+            return 0.0, -2
+        exp10 += esign * e
+
+# The number must be followed by whitespace
+    if pos < n and buf[pos] > 32:
+        return 0.0, -2
+
+    if mant == 0:
+        return sign * 0.0, pos
+    if not exact or exp10 < -22 or exp10 > 22:
+        return 0.0, -2
+
+    value = float(mant)
+    if exp10 >= 0:
+        value *= _POW10[exp10]
+    else:
+        value /= _POW10[-exp10]
+
+    return sign * value, pos
+
+# Keyword at the beginning of each block of LOCPROJ
+_ORBITAL = np.frombuffer(b'orbital', dtype=np.uint8)
+
+def _skip_keyword(buf, pos, word):
+    r"""
+    Skips whitespace and the keyword 'word' (a byte array) in the byte array
+    'buf' starting at position 'pos'. Returns the position right after the
+    keyword, -1 if the end of the buffer is reached, and -2 if the next
+    token is not 'word'. A negative 'pos' is returned unchanged.
+    """
+    n = buf.size
+    if pos < 0:
+        return pos
+    while pos < n and buf[pos] <= 32:
+        pos += 1
+    if pos == n:
+        return -1
+    nw = word.size
+    if pos + nw > n:
+        return -2
+    for i in range(nw):
+        if buf[pos + i] != word[i]:
+            return -2
+    pos += nw
+    if pos < n and buf[pos] > 32:
+        return -2
+    return pos
+
+def _parse_locproj_body(buf, nspin, nk, nband, nproj, eigs, ferw, plo_ri):
+    r"""
+    Fills eigenvalues, Fermi weights and projectors directly from the bytes
+    of the data part of LOCPROJ.
+
+    Each (ispin, ik, ib) block consists of a line 'orbital isp ik ib eig ferw'
+    followed by 'nproj' lines 'ip re im'. Projectors are written to 'plo_ri',
+    a float view of the complex array with interleaved real and imaginary parts.
+
+    Returns 0 on success, 1 if the data is incomplete, 2 if the block
+    indices are inconsistent with the expected order, and 3 if a token
+    other than the keyword 'orbital' is not a number that can be converted
+    exactly by '_scan_float()'.
+
+    The function is only used if Numba is available.
+    """
+    pos = 0
+    for ispin in range(nspin):
+        for ik in range(nk):
+            for ib in range(nband):
+                pos = _skip_keyword(buf, pos, _ORBITAL)
+                isp_, pos = _scan_float(buf, pos)
+                ik_, pos = _scan_float(buf, pos)
+                ib_, pos = _scan_float(buf, pos)
+                eig, pos = _scan_float(buf, pos)
+                fw, pos = _scan_float(buf, pos)
+                if pos < 0:
+                    return 1 if pos == -1 else 3
+                if isp_ != ispin + 1 or ik_ != ik + 1 or ib_ != ib + 1:
+                    return 2
+                eigs[ik, ib, ispin] = eig
+                ferw[ik, ib, ispin] = fw
+                for ip in range(nproj):
+                    ip_, pos = _scan_float(buf, pos)
+                    re_, pos = _scan_float(buf, pos)
+                    im_, pos = _scan_float(buf, pos)
+                    if pos < 0:
+                        return 1 if pos == -1 else 3
+                    plo_ri[ip, ispin, ik, 2 * ib] = re_
+                    plo_ri[ip, ispin, ik, 2 * ib + 1] = im_
+    return 0
+
+def _parse_eigenval_body(buf, starts, iline0, nktot, nband, ispin, kpts, kwghts, eigs, ferw, err):
+    r"""
+    Fills k-points, weights, eigenvalues and Fermi weights from the bytes
+    of EIGENVAL.
+
+    'starts' contains the offsets of all lines in 'buf' (see '_line_starts()')
+    and 'iline0' is the index of the last header line. Each k-point block
+    consists of an empty line, a k-point line and 'nband' band lines.
+    K-points are processed in parallel. 'err[ik]' is set to 1 if a line
+    of k-point 'ik' does not contain the expected numbers (none on the
+    empty line, 4 on the k-point line and 2 * ispin + 1 on band lines),
+    and to 2 if a token is not a number that '_scan_float()' can convert
+    exactly. In the latter case the block is not complete and must be
+    parsed again by the caller.
+
+    The function is only used if Numba is available.
+    """
+    for ik in prange(nktot):
+# The separator line must be empty
+        iline = iline0 + ik * (nband + 2) + 1
+        pos = starts[iline]
+        end = starts[iline + 1]
+        while pos < end and buf[pos] <= 32:
+            pos += 1
+        if pos < end:
+            err[ik] = 1
+
+        iline += 1
+        pos = starts[iline]
+        end = starts[iline + 1]
+        for i in range(3):
+            x, pos = _scan_float(buf, pos)
+            kpts[ik, i] = x
+        x, pos = _scan_float(buf, pos)
+        kwghts[ik] = x
+        if err[ik] != 0:
+            pass
+        elif pos == -2:
+            err[ik] = 2
+        elif pos < 0 or pos > end:
+            err[ik] = 1
+        else:
+            while pos < end and buf[pos] <= 32:
+                pos += 1
+            if pos < end:
+                err[ik] = 1
+
+        for ib in range(nband):
+            if err[ik] != 0:
+                break
+            iline += 1
+            pos = starts[iline]
+            end = starts[iline + 1]
+            x, pos = _scan_float(buf, pos) # band index
+            for isp in range(ispin):
+                x, pos = _scan_float(buf, pos)
+                eigs[ik, ib, isp] = x
+            for isp in range(ispin):
+                x, pos = _scan_float(buf, pos)
+                ferw[ik, ib, isp] = x
+            if pos == -2:
+                err[ik] = 2
+                break
+            if pos < 0 or pos > end:
+                err[ik] = 1
+                break
+# Nothing but whitespace is allowed till the end of the line
+            while pos < end and buf[pos] <= 32:
+                pos += 1
+            if pos < end:
+                err[ik] = 1
+                break
+
+if _has_numba:
+    _scan_float = njit(cache=True)(_scan_float)
+    _skip_keyword = njit(cache=True)(_skip_keyword)
+    _parse_locproj_body = njit(cache=True)(_parse_locproj_body)
+    _parse_eigenval_body = njit(cache=True, parallel=True)(_parse_eigenval_body)
 
 ################################################################################
 ################################################################################
@@ -64,8 +407,14 @@ def read_lines(filename):
 class VaspData:
     """
     Container class for all VASP data.
+
+    'use_cache' enables the on-disk cache of LOCPROJ data (see `Plocar.from_file()`).
+    'file_cache' is a dictionary keeping the content of the text files
+    in memory; passing the same dictionary to several instances avoids
+    re-reading unchanged files of the same directory.
     """
-    def __init__(self, vasp_dir, read_all=True, efermi_required=True):
+    def __init__(self, vasp_dir, read_all=True, efermi_required=True, use_cache=False,
+                 file_cache=None):
         self.vasp_dir = vasp_dir
 
         self.plocar = Plocar()
@@ -75,17 +424,17 @@ class VaspData:
         self.doscar = Doscar()
 
         if read_all:
-            self.plocar.from_file(vasp_dir)
-            self.poscar.from_file(vasp_dir)
-            self.kpoints.from_file(vasp_dir)
+            self.plocar.from_file(vasp_dir, use_cache=use_cache)
+            self.poscar.from_file(vasp_dir, file_cache=file_cache)
+            self.kpoints.from_file(vasp_dir, file_cache=file_cache)
             try:
-                self.eigenval.from_file(vasp_dir)
-            except (IOError, StopIteration):
+                self.eigenval.from_file(vasp_dir, file_cache=file_cache)
+            except (IOError, StopIteration, IndexError):
                 self.eigenval.eigs = None
                 self.eigenval.ferw = None
                 print("!!! WARNING !!!: Error reading from EIGENVAL, trying LOCPROJ")
             try:
-                self.doscar.from_file(vasp_dir)
+                self.doscar.from_file(vasp_dir, file_cache=file_cache)
             except (IOError, StopIteration):
                 if efermi_required:
                     print("!!! WARNING !!!: Error reading from Efermi from DOSCAR, trying LOCPROJ")
@@ -99,6 +448,71 @@ class VaspData:
                     print("!!! WARNING !!!: Error reading from DOSCAR, taking Efermi from config")
                     self.doscar.ncdij = self.plocar.nspin
 
+################################################################################
+################################################################################
+#
+# class ProjParams
+#
+################################################################################
+################################################################################
+class ProjParams:
+    """
+    Parameters of projectors read from LOCPROJ.
+
+    The parameters are stored as arrays running over projectors, so that
+    they can be used in vectorized expressions. For compatibility, the object
+    also behaves as a list of dictionaries with keys 'label', 'isite', 'l', 'm'.
+
+    Properties:
+        - label ([str]) : orbital labels
+        - isite_arr (numpy.array(nproj, dtype=int)) : site indices (starting from 1)
+        - l_arr (numpy.array(nproj, dtype=int)) : orbital quantum numbers
+        - m_arr (numpy.array(nproj, dtype=int)) : orbital indices within the l-shell
+    """
+    def __init__(self, nproj):
+        self.label = nproj * ['']
+        self.isite_arr = np.zeros(nproj, dtype=np.int32)
+        self.l_arr = np.zeros(nproj, dtype=np.int32)
+        self.m_arr = np.zeros(nproj, dtype=np.int32)
+
+    @classmethod
+    def from_dicts(cls, dicts):
+        r"""
+        Creates the parameters from a list of dictionaries with keys
+        'label', 'isite', 'l', 'm' (one per projector).
+        """
+        proj_params = cls(len(dicts))
+        proj_params.label = [par['label'] for par in dicts]
+        proj_params.isite_arr[:] = [par['isite'] for par in dicts]
+        proj_params.l_arr[:] = [par['l'] for par in dicts]
+        proj_params.m_arr[:] = [par['m'] for par in dicts]
+        return proj_params
+
+    def _as_dict(self, ip):
+        return {'label': self.label[ip],
+                'isite': int(self.isite_arr[ip]),
+                'l': int(self.l_arr[ip]),
+                'm': int(self.m_arr[ip])}
+
+    def as_dicts(self):
+        r"""
+        Returns the parameters as a list of dictionaries (one per projector).
+        The list is built from the current arrays on each call.
+        """
+        return [self._as_dict(ip) for ip in range(len(self))]
+
+    def __len__(self):
+        return len(self.label)
+
+    def __getitem__(self, ip):
+        if isinstance(ip, slice):
+            return self.as_dicts()[ip]
+        return self._as_dict(range(len(self))[ip])
+
+    def __iter__(self):
+        for ip in range(len(self)):
+            yield self._as_dict(ip)
+
 ################################################################################
 ################################################################################
 #
@@ -120,7 +534,8 @@ class Plocar:
         self.plo = None
         self.proj_params = None
 
-    def from_file(self, vasp_dir='./', plocar_filename='PLOCAR'):
+    def from_file(self, vasp_dir='./', plocar_filename='PLOCAR', use_cache=False,
+                  plo_dtype=np.complex128):
         r"""
         Reads non-normalized projectors from a binary file (`PLOCAR' by default)
         generated by VASP PLO interface.
@@ -130,38 +545,128 @@ class Plocar:
 
         vasp_dir (str) : path to the VASP working directory [default = `./']
         plocar_filename (str) : filename [default = `PLOCAR']
+        use_cache (bool) : if True, the parsed data is stored in `LOCPROJ.npz'
+                           and reused as long as the size and modification
+                           time of LOCPROJ do not change [default = False]
+        plo_dtype (numpy.dtype) : complex type of the raw projectors; `complex64'
+                           halves the memory taken by 'plo' for large
+                           (nk, nband, nproj) at the cost of single precision
+                           [default = `complex128']
 
         """
 # Add a slash to the path name if necessary
         if vasp_dir[-1] != '/':
             vasp_dir += '/'
 
+        locproj_filename = vasp_dir + "LOCPROJ"
+        cache_filename = locproj_filename + ".npz"
+        plo_dtype = np.dtype(plo_dtype)
+        if plo_dtype.kind != 'c':
+            raise ValueError("plo_dtype must be a complex type, got %s"%(plo_dtype))
+
+        if use_cache:
+            key = np.array([os.path.getsize(locproj_filename), os.path.getmtime(locproj_filename)])
+            if self.load_cache(cache_filename, key, plo_dtype):
+                return
+
 #        self.params, self.plo, self.ferw = c_plocar_io.read_plocar(vasp_dir + plocar_filename)
 #        self.proj_params, self.plo = self.temp_parser(projcar_filename=vasp_dir + "PROJCAR", locproj_filename=vasp_dir + "LOCPROJ")
-        self.proj_params, self.plo = self.locproj_parser(locproj_filename=vasp_dir + "LOCPROJ")
+        self.proj_params, self.plo = self.locproj_parser(locproj_filename=locproj_filename,
+                                                         plo_dtype=plo_dtype)
+
+        if use_cache:
+            self.save_cache(cache_filename, key)
 
 
-    def locproj_parser(self, locproj_filename='LOCPROJ'):
+    def save_cache(self, cache_filename, key):
+        r"""
+        Stores the data parsed from LOCPROJ in a NumPy archive together with
+        the fingerprint 'key' of the source file.
+        """
+        data = {'key': key, 'plo': self.plo, 'eigs': self.eigs, 'ferw': self.ferw,
+                'dims': np.array([self.ncdij, self.nspin, self.nspin_band, self.nband, self.nc_flag]),
+                'label': np.array(self.proj_params.label),
+                'isite': self.proj_params.isite_arr,
+                'l': self.proj_params.l_arr,
+                'm': self.proj_params.m_arr}
+        if hasattr(self, 'efermi'):
+            data['efermi'] = self.efermi
+        try:
+            np.savez(cache_filename, **data)
+        except OSError:
+            print("!!! WARNING !!!: Could not write LOCPROJ cache to %s"%(cache_filename))
+
+
+    def load_cache(self, cache_filename, key, plo_dtype=np.complex128):
+        r"""
+        Restores the data from a cache created by `save_cache()`.
+
+        Returns False if the cache does not exist, if it was created
+        for a different version of LOCPROJ (fingerprint 'key' does not match)
+        or if the stored projectors have a lower precision than 'plo_dtype'.
+        """
+        if not os.path.isfile(cache_filename):
+            return False
+
+# A damaged or incompatible cache is not an error: LOCPROJ is simply parsed again
+# The file is opened here so that it is also closed if np.load() fails
+        try:
+            with open(cache_filename, 'rb') as fh, np.load(fh) as data:
+                if not np.array_equal(data['key'], key):
+                    return False
+# Each access to 'data' reads the archive member again
+                plo = data['plo']
+                if not np.can_cast(plo_dtype, plo.dtype):
+                    return False
+                plo = plo.astype(plo_dtype, copy=False)
+
+                dims = [int(d) for d in data['dims']]
+                efermi = float(data['efermi']) if 'efermi' in data else None
+                eigs = data['eigs']
+                ferw = data['ferw']
+
+                label = data['label']
+                proj_params = ProjParams(len(label))
+                proj_params.label = [str(lab) for lab in label]
+                proj_params.isite_arr[:] = data['isite']
+                proj_params.l_arr[:] = data['l']
+                proj_params.m_arr[:] = data['m']
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return False
+
+        self.ncdij, self.nspin, self.nspin_band, self.nband, self.nc_flag = dims
+        if efermi is not None:
+            self.efermi = efermi
+        self.plo, self.eigs, self.ferw = plo, eigs, ferw
+        self.proj_params = proj_params
+
+        print("Read parameters: LOCPROJ (cached in %s)"%(cache_filename))
+        return True
+
+
+    def locproj_parser(self, locproj_filename='LOCPROJ', plo_dtype=np.complex128):
         r"""
         Parses LOCPROJ (for VASP >= 5.4.2) to get VASP projectors.
+        The projectors are stored in an array of type 'plo_dtype'.
 
         This is a prototype parser that should eventually be written in C for
         better performance on large files.
 
-        Returns projector parameters (site/orbital indices etc.) and an array
-        with projectors.
+        Returns projector parameters (site/orbital indices etc.) as a ProjParams
+        object and an array with projectors.
         """
-        orb_labels = ["s", "py", "pz", "px", "dxy", "dyz", "dz2", "dxz", "dx2-y2",
-                      "fy(3x2-y2)", "fxyz", "fyz2", "fz3", "fxz2", "fz(x2-y2)", "fx(x2-3y2)"]
-
-        def lm_to_l_m(lm):
-            l = int(np.sqrt(lm))
-            m = lm - l*l
-            return l, m
+# The parsers write real and imaginary parts next to each other and
+# rely on a complex type
+        plo_dtype = np.dtype(plo_dtype)
+        if plo_dtype.kind != 'c':
+            raise ValueError("plo_dtype must be a complex type, got %s"%(plo_dtype))
 
 # Read the first line of LOCPROJ to get the dimensions
-        with open(locproj_filename, 'rt') as f:
-            line = f.readline()
+# The file is memory-mapped: the header is read line by line and the
+# (large) data block is then passed to the numeric parser as raw bytes
+        with open(locproj_filename, 'rb') as fh, \
+             mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as f:
+            line = f.readline().decode()
             line = line.split("#")[0]
             sline = line.split()
             self.ncdij, nk, self.nband, nproj = list(map(int, sline[0:4]))
@@ -177,8 +682,8 @@ class Plocar:
             except:
                 print("!!! WARNING !!!: Error reading E-Fermi from LOCPROJ, trying DOSCAR")
 
-            plo = np.zeros((nproj, self.nspin, nk, self.nband), dtype=np.complex128)
-            proj_params = [{} for i in range(nproj)]
+            plo = np.zeros((nproj, self.nspin, nk, self.nband), dtype=plo_dtype)
+            proj_params = ProjParams(nproj)
 
             iproj_site = 0
             is_first_read = True
@@ -191,55 +696,78 @@ class Plocar:
                 self.nc_flag = 0
             print("NC FLAG : {}".format(self.nc_flag))
 
-# First read the header block with orbital labels
-            line = self.search_for(f, "^ *ISITE")
-            ip = 0
-            while line:
+# First read the header block with orbital labels: exactly 'nproj' lines
+# followed by an empty line
+            errmsg = "Number of projectors in the header is wrong in LOCPROJ"
+            line = self.search_for(f, _ISITE_RE).decode()
+            for ip in range(nproj):
+                assert line.strip(), errmsg
                 sline = line.split(':')
                 isite = int(sline[1].split()[0])
                 label = sline[-1].strip()
-                lm = orb_labels.index(label)
-                l, m = lm_to_l_m(lm)
+                l, m = _ORB_L_M[label]
 #                    ip_new = iproj_site * norb + il
 #                    ip_prev = (iproj_site - 1) * norb + il
-                proj_params[ip]['label'] = label
-                proj_params[ip]['isite'] = isite
-                proj_params[ip]['l'] = l
+                proj_params.label[ip] = label
+                proj_params.isite_arr[ip] = isite
+                proj_params.l_arr[ip] = l
                 if self.nc_flag == True:
                     if (ip % 2) == 0:
-                        proj_params[ip]['m'] = 2*m
+                        proj_params.m_arr[ip] = 2*m
                     else:
-                        proj_params[ip]['m'] = 2*m + 1
+                        proj_params.m_arr[ip] = 2*m + 1
                 else:
-                    proj_params[ip]['m'] = m
+                    proj_params.m_arr[ip] = m
 
-                ip +=1
-                
-                line = f.readline().strip()
-            
-            assert ip == nproj, "Number of projectors in the header is wrong in LOCPROJ"
+                line = f.readline().decode()
+
+            assert not line.strip(), errmsg
 
             self.eigs = np.zeros((nk, self.nband, self.nspin_band))
             self.ferw = np.zeros((nk, self.nband, self.nspin_band))
 
-            patt = re.compile("^orbital")
-
-            for ispin in range(self.nspin):
-                for ik in range(nk):
-                    for ib in range(self.nband):
-                        line = ""
-                        while not line:
-                            line = f.readline().strip()
-                        sline = line.split()
-                        isp_, ik_, ib_ = list(map(int, sline[1:4]))
-                        assert isp_ == ispin + 1 and ik_ == ik + 1 and ib_ == ib + 1, "Inconsistency in reading LOCPROJ"
-                        self.eigs[ik, ib, ispin] = float(sline[4])
-                        self.ferw[ik, ib, ispin] = float(sline[5])
-                        for ip in range(nproj):
-                            line = f.readline()
-                            sline = line.split()
-                            ctmp = complex(float(sline[1]), float(sline[2]))
-                            plo[ip, ispin, ik, ib] = ctmp 
+# The rest of the file consists of (ispin, ik, ib) blocks, each made of
+# a line 'orbital isp ik ib eig ferw' followed by 'nproj' lines 'ip re im'.
+            status = -1
+            if _has_numba:
+# The compiled parser reads the mapped bytes directly (no copy)
+# (all references to the view, including those held by the frames of
+# a traceback, must be released before the file is unmapped)
+                buf = np.frombuffer(f, dtype=np.uint8, offset=f.tell())
+                try:
+                    status = _parse_locproj_body(buf, self.nspin, nk, self.nband, nproj,
+                                                 self.eigs, self.ferw, plo.view(plo.real.dtype))
+                except BaseException as exc:
+                    traceback.clear_frames(exc.__traceback__)
+                    raise
+                finally:
+                    del buf
+                assert status != 1, "LOCPROJ file is incomplete"
+                assert status != 2, "Inconsistency in reading LOCPROJ"
+
+# Data that the compiled parser cannot convert exactly or does not
+# recognize (status 3) is parsed again by NumPy, which decides
+            if status != 0:
+# Once the 'orbital' labels are removed, the data is a plain stream of
+# numbers with the same number of entries in each block.
+                nblock = self.nspin * nk * self.nband
+                stride = 5 + 3 * nproj
+                data = np.fromstring(f[f.tell():].replace(b'orbital', b' '), sep=' ')
+                assert data.size >= nblock * stride, "LOCPROJ file is incomplete"
+
+                data = data[:nblock * stride].reshape(nblock, stride)
+
+                inds_ref = np.indices((self.nspin, nk, self.nband)).reshape(3, -1).T + 1
+                assert np.all(data[:, 0:3] == inds_ref), "Inconsistency in reading LOCPROJ"
+
+                shape = (self.nspin, nk, self.nband)
+                self.eigs[:, :, :] = data[:, 3].reshape(shape).transpose((1, 2, 0))
+                self.ferw[:, :, :] = data[:, 4].reshape(shape).transpose((1, 2, 0))
+
+# Pairs (re, im) are reinterpreted as complex numbers without arithmetic
+                re_im = np.ascontiguousarray(data[:, 5:].reshape(nblock, nproj, 3)[:, :, 1:])
+                plo_block = re_im.view(np.complex128).reshape(nblock, nproj)
+                np.copyto(plo, plo_block.T.reshape((nproj,) + shape))
 
         print("Read parameters: LOCPROJ")
         for il, par in enumerate(proj_params):
@@ -250,12 +778,12 @@ class Plocar:
 
     def search_for(self, f, patt):
         r"""
-        Reads file 'f' until pattern 'patt' is encountered and returns
-        the corresponding line.
+        Reads file 'f' until compiled pattern 'patt' is encountered and returns
+        the corresponding line. The file can be opened in text or binary
+        mode (or memory-mapped), provided 'patt' is of the matching type.
         """
-        cpatt = re.compile(patt)
-        line = "x"
-        while not re.match(cpatt, line) and line:
+        line = f.readline()
+        while line and not patt.match(line):
             line = f.readline()
 
         return line
@@ -284,7 +812,7 @@ class Poscar:
     def __init__(self):
         self.q_cart = None
 
-    def from_file(self, vasp_dir='./', poscar_filename='POSCAR'):
+    def from_file(self, vasp_dir='./', poscar_filename='POSCAR', file_cache=None):
         """
         Reads POSCAR and returns a dictionary.
 
@@ -293,17 +821,19 @@ class Poscar:
 
         vasp_dir (str) : path to the VASP working directory [default = `./']
         plocar_filename (str) : filename [default = `POSCAR']
+        file_cache (dict) : in-memory cache of file contents [default = None]
 
         """
 # Convenince local function
         def readline_remove_comments():
-            return next(f).split('!')[0].split('#')[0].strip()
+            return _COMMENT_RE.sub('', next(f)).strip()
 
 # Add a slash to the path name if necessary
         if vasp_dir[-1] != '/':
             vasp_dir += '/'
 
-        f = read_lines(vasp_dir + poscar_filename)
+        lines = _slurp(vasp_dir + poscar_filename, file_cache)
+        f = iter(lines)
 # Comment line
         comment = next(f).rstrip()
         print("  Found POSCAR, title line: %s"%(comment))
@@ -353,22 +883,19 @@ class Poscar:
         self.kpt_basis = np.linalg.inv(self.a_brav.T)
 
 # Read atomic positions
-        self.q_types = []
+# Only the first three columns are relevant (there can be extra columns,
+# e.g. selective dynamics flags), they are converted all at once
+        block = [readline_remove_comments().split()[:3] for iq in range(self.nq)]
+        coords = np.array(block, dtype=float).reshape(self.nq, 3)
+        if cartesian:
+            coords = coords @ self.kpt_basis.T
+
+        self.q_types = np.split(coords, np.cumsum(self.nions)[:-1])
         self.type_of_ion = []
         for it in range(self.ntypes):
 # Array mapping ion index to type
             self.type_of_ion += self.nions[it] * [it]
 
-            q_at_it = np.zeros((self.nions[it], 3))
-            for iq in range(self.nions[it]):
-                sline = readline_remove_comments()
-                qcoord = list(map(float, sline.split()[:3]))
-                if cartesian:
-                    qcoord = np.dot(self.kpt_basis, qcoord)
-                q_at_it[iq, :] = qcoord
-
-            self.q_types.append(q_at_it)
-
         print("  Total number of ions:", self.nq)
         print("  Number of types:", self.ntypes)
         print("  Number of ions for each type:", self.nions)
@@ -405,7 +932,7 @@ class Kpoints:
 #
 # Reads IBZKPT file
 #
-    def from_file(self, vasp_dir='./', ibz_filename='IBZKPT'):
+    def from_file(self, vasp_dir='./', ibz_filename='IBZKPT', file_cache=None):
         """
         Reads from IBZKPT: k-points and optionally
         tetrahedra topology (if present).
@@ -415,6 +942,7 @@ class Kpoints:
 
         vasp_dir (str) : path to the VASP working directory [default = `./']
         plocar_filename (str) : filename [default = `IBZKPT']
+        file_cache (dict) : in-memory cache of file contents [default = None]
 
         """
 
@@ -422,49 +950,37 @@ class Kpoints:
         if vasp_dir[-1] != '/':
             vasp_dir += '/'
 
-        ibz_file = read_lines(vasp_dir + ibz_filename)
+        lines = _slurp(vasp_dir + ibz_filename, file_cache)
 
-#   Skip comment line
-        line = next(ibz_file)
-#   Number of k-points
-        line = next(ibz_file)
-        self.nktot = int(line.strip().split()[0])
+#   Skip comment line, then read the number of k-points
+        self.nktot = int(lines[1].strip().split()[0])
 
         print()
         print("   {0:>26} {1:d}".format("Total number of k-points:", self.nktot))
 
-        self.kpts = np.zeros((self.nktot, 3))
-        self.kwghts = np.zeros((self.nktot))
-
 #   Skip comment line
-        line = next(ibz_file)
-        for ik in range(self.nktot):
-            line = next(ibz_file)
-            sline = line.strip().split()
-            self.kpts[ik, :] = list(map(float, sline[:3]))
-            self.kwghts[ik] = float(sline[3])
-
-        self.kwghts /= self.nktot
+#   All k-point lines are converted at once
+        ipos = 3
+        kdata = np.fromstring('\n'.join(lines[ipos:ipos + self.nktot]), sep=' ').reshape(self.nktot, 4)
+        self.kpts = kdata[:, :3].copy()
+        self.kwghts = kdata[:, 3] / self.nktot
+        ipos += self.nktot
 
 # Attempt to read tetrahedra
 #   Skip comment line ("Tetrahedra")
         try:
-            line = next(ibz_file)
-
 #   Number of tetrahedra and volume = 1/(6*nkx*nky*nkz)
-            line = next(ibz_file)
-            sline = line.split()
+            sline = lines[ipos + 1].split()
             self.ntet = int(sline[0])
             self.volt = float(sline[1])
 
             print("   {0:>26} {1:d}".format("Total number of tetrahedra:", self.ntet))
 
 #   Traditionally, itet[it, 0] contains multiplicity
-            self.itet = np.zeros((self.ntet, 5), dtype=int)
-            for it in range(self.ntet):
-               line = next(ibz_file)
-               self.itet[it, :] = list(map(int, line.split()[:5]))
-        except StopIteration as ValueError:
+            ipos += 2
+            tdata = np.fromstring('\n'.join(lines[ipos:ipos + self.ntet]), dtype=int, sep=' ')
+            self.itet = tdata.reshape(self.ntet, -1)[:, :5]
+        except (IndexError, ValueError):
             print("  No tetrahedron data found in %s. Skipping..."%(ibz_filename))
             self.ntet = 0
 
@@ -492,7 +1008,7 @@ class Eigenval:
         self.eigs = None
         self.ferw = None
 
-    def from_file(self, vasp_dir='./', eig_filename='EIGENVAL'):
+    def from_file(self, vasp_dir='./', eig_filename='EIGENVAL', file_cache=None):
         """
         Reads eigenvalues from EIGENVAL. Note that the file also
         contains k-points with weights. They are also stored and
@@ -503,7 +1019,11 @@ class Eigenval:
         if vasp_dir[-1] != '/':
             vasp_dir += '/'
 
-        f = read_lines(vasp_dir + eig_filename)
+        raw = _read_bytes(vasp_dir + eig_filename, file_cache)
+        buf = np.frombuffer(raw, dtype=np.uint8)
+        starts = _line_starts(buf)
+        nlines = starts.size - 1
+        f = (raw[starts[i]:starts[i+1]].decode() for i in range(min(6, nlines)))
 
 # First line: only the first and the last number out of four
 # are used; these are 'nions' and 'ispin'
@@ -533,19 +1053,55 @@ class Eigenval:
         self.eigs = np.zeros((self.nktot, self.nband, self.ispin))
         self.ferw = np.zeros((self.nktot, self.nband, self.ispin))
 
-        for ik in range(self.nktot):
-            sline = next(f) # Empty line
-            sline = next(f) # k-point info
-            tmp = list(map(float, sline.split()))
-            self.kpts[ik, :] = tmp[:3]
-            self.kwghts[ik] = tmp[3]
-
-            for ib in range(self.nband):
-                sline = next(f).split()
-                tmp = list(map(float, sline))
-                assert len(tmp) == 2 * self.ispin + 1, "EIGENVAL file is incorrect (probably from old versions of VASP)"
-                self.eigs[ik, ib, :] = tmp[1:self.ispin+1]
-                self.ferw[ik, ib, :] = tmp[self.ispin+1:]
+# Each k-point block consists of an empty line, a line with the k-point
+# and its weight, and 'nband' lines with eigenvalues and Fermi weights
+        ncol = 2 * self.ispin + 1
+        nblock = self.nband + 2
+        ipos = 6
+        if nlines < ipos + self.nktot * nblock:
+            raise IndexError("EIGENVAL file is truncated")
+
+        if _has_numba:
+# Blocks are at fixed line offsets and are parsed in parallel
+            err = np.zeros(self.nktot, dtype=np.int8)
+            _parse_eigenval_body(buf, starts, ipos - 1, self.nktot, self.nband, self.ispin,
+                                 self.kpts, self.kwghts, self.eigs, self.ferw, err)
+            assert not (err == 1).any(), "EIGENVAL file is incorrect (probably from old versions of VASP)"
+
+# Blocks with tokens that the compiled parser cannot convert exactly or
+# does not recognize are converted (or rejected) by NumPy
+            for ik in np.flatnonzero(err == 2):
+                iline = ipos + ik * nblock + 1
+                ntok = _count_tokens(buf, starts[iline:iline + self.nband + 2])
+                assert ntok[0] == 4 and np.all(ntok[1:] == ncol), "EIGENVAL file is incorrect (probably from old versions of VASP)"
+                data = np.fromstring(raw[starts[iline]:starts[iline + self.nband + 1]], sep=' ')
+                assert data.size == 4 + self.nband * ncol, "EIGENVAL file is incorrect (probably from old versions of VASP)"
+                self.kpts[ik, :] = data[:3]
+                self.kwghts[ik] = data[3]
+                flat = data[4:].reshape(self.nband, ncol)
+                self.eigs[ik, :, :] = flat[:, 1:self.ispin+1]
+                self.ferw[ik, :, :] = flat[:, self.ispin+1:]
+            return
+
+# Without empty lines, each block is a k-point with its weight (4 numbers)
+# followed by 'nband' rows of 'ncol' numbers. All blocks are converted at once
+# and the band data is then handled as a flat (nktot * nband, ncol) array.
+# Every line must have the expected number of entries: none on the empty
+# line, 4 on the k-point line and 'ncol' on each band line
+        ntok = _count_tokens(buf, starts[ipos:ipos + self.nktot * nblock + 1])
+        ntok_ref = np.array([0, 4] + self.nband * [ncol])
+        assert np.all(ntok.reshape(self.nktot, nblock) == ntok_ref), "EIGENVAL file is incorrect (probably from old versions of VASP)"
+
+        stride = 4 + self.nband * ncol
+        data = np.fromstring(raw[starts[ipos]:starts[ipos + self.nktot * nblock]], sep=' ')
+        assert data.size == self.nktot * stride, "EIGENVAL file is incorrect (probably from old versions of VASP)"
+        data = data.reshape(self.nktot, stride)
+        self.kpts = data[:, :3].copy()
+        self.kwghts = data[:, 3].copy()
+
+        flat = data[:, 4:].reshape(self.nktot * self.nband, ncol)
+        self.eigs = flat[:, 1:self.ispin+1].reshape(self.nktot, self.nband, self.ispin).copy()
+        self.ferw = flat[:, self.ispin+1:].reshape(self.nktot, self.nband, self.ispin).copy()
 
 
 ################################################################################
@@ -563,7 +1119,7 @@ class Doscar:
         self.ncdij = None
         self.efermi = None
 
-    def from_file(self, vasp_dir='./', dos_filename='DOSCAR'):
+    def from_file(self, vasp_dir='./', dos_filename='DOSCAR', file_cache=None):
         """
         Reads only E_Fermi from DOSCAR.
         """
@@ -572,7 +1128,8 @@ class Doscar:
         if vasp_dir[-1] != '/':
             vasp_dir += '/'
 
-        f = read_lines(vasp_dir + dos_filename)
+        lines = _slurp(vasp_dir + dos_filename, file_cache)
+        f = iter(lines)
 
 # First line: NION, NION, JOBPAR, NCDIJ
         sline = next(f).split()
@@ -585,6 +1142,43 @@ class Doscar:
         sline = next(f).split()
         self.efermi = float(sline[3])
 
+################################################################
+#
+# Profiling of parsers
+#
+################################################################
+def _profile_parse(vasp_dir='./', nlines=10):
+    r"""
+    Profiles the parsers of all VASP files found in 'vasp_dir' using cProfile
+    and prints, for each file, the total time and the 'nlines' most
+    expensive calls (sorted by cumulative time).
+
+    This is a development tool used to decide which parts of the parsers
+    are worth optimizing.
+    """
+    import cProfile
+    import pstats
+
+    if vasp_dir[-1] != '/':
+        vasp_dir += '/'
+
+    readers = [('LOCPROJ', Plocar), ('POSCAR', Poscar), ('IBZKPT', Kpoints),
+               ('EIGENVAL', Eigenval), ('DOSCAR', Doscar)]
+    for filename, reader in readers:
+        if not os.path.isfile(vasp_dir + filename):
+            print("  %s not found, skipping"%(filename))
+            continue
+
+        prof = cProfile.Profile()
+        prof.enable()
+        reader().from_file(vasp_dir)
+        prof.disable()
+
+        stats = pstats.Stats(prof).sort_stats('cumulative')
+        print()
+        print("  {0}: {1:.4f} s".format(filename, stats.total_tt))
+        stats.print_stats(nlines)
+
 # TODO: implement output of SYMMCAR in VASP and read it here
 ################################################################
 #
@@ -597,14 +1191,15 @@ def read_symmcar(vasp_dir, symm_filename='SYMMCAR'):
     """
 #   Shorthand for simple parsing
     def extract_int_par(parname):
-        return int(re.findall(parname + '\s*=\s*(\d+)', line)[-1])
+        return int(_SYMMCAR_PAR_RE[parname].findall(line)[-1])
 
 # Add a slash to the path name if necessary
     if vasp_dir[-1] != '/':
         vasp_dir += '/'
 
     symmcar_exist = False
-    sym_file = read_lines(vasp_dir + symm_filename)
+    lines = _slurp(vasp_dir + symm_filename)
+    sym_file = iter(lines)
     line = next(sym_file)
     nrot = extract_int_par('NROT')
 
@@ -639,20 +1234,17 @@ def read_symmcar(vasp_dir, symm_filename='SYMMCAR'):
 #   Skip comment "  Permutation map..."
         line = next(sym_file)
 #   Permutations (in chunks of 20 indices per line)
+        nblocks = (nion - 1) // 20 + 1
         for it in range(ntrans):
-            for ibl in range((nion - 1) // 20 + 1):
-                i1 = ibl * 20
-                i2 = (ibl + 1) * 20
-                line = next(sym_file)
-                rot_map[irot, it, i1:i2] = list(map(int, line.split()))
+            block = ' '.join(next(sym_file) for ibl in range(nblocks))
+            rot_map[irot, it, :] = np.fromstring(block, dtype=int, sep=' ', count=nion)
 
             for l in range(lmax + 1):
                 mmax = 2 * l + 1
 #   Comment: "L = ..."
             line = next(sym_file)
-            for m in range(mmax):
-                line = next(sym_file)
-                rot_mats[irot, l, m, :mmax] = list(map(float, line.split()[:mmax]))
+            block = [next(sym_file).split()[:mmax] for m in range(mmax)]
+            rot_mats[irot, l, :mmax, :mmax] = np.array(block, dtype=float)
 
     data.update({ 'nrot': nrot, 'ntrans': ntrans,
                   'lmax': lmax, 'nion': nion,
@@ -7,6 +7,7 @@ _rpath = os.path.dirname(rpath.__file__) + '/'
 
 import mytest
 import numpy as np
+from triqs_dft_tools.converters.plovasp import vaspio
 from triqs_dft_tools.converters.plovasp.vaspio import Eigenval
 
 ################################################################################
@@ -23,6 +24,7 @@ class TestEigenval(mytest.MyTestCase):
     Scenarios:
     - correct EIGENVAL file
     - wrong EIGENVAL file from old versions of VASP
+    - EIGENVAL file with a short and a long band line
 
     """
 # Scenario 1
@@ -58,3 +60,18 @@ class TestEigenval(mytest.MyTestCase):
         with self.assertRaisesRegex(AssertionError, err_mess):
             eigenval.from_file(vasp_dir=_rpath, eig_filename=filename)
 
+# Scenario 3
+    def test_mixed_lines(self):
+        filename = 'EIGENVAL.mixed'
+
+        err_mess = "EIGENVAL file is incorrect"
+        has_numba = vaspio._has_numba
+        try:
+            for use_numba in sorted({False, has_numba}):
+                vaspio._has_numba = use_numba
+                eigenval = Eigenval()
+                with self.assertRaisesRegex(AssertionError, err_mess):
+                    eigenval.from_file(vasp_dir=_rpath, eig_filename=filename)
+        finally:
+            vaspio._has_numba = has_numba
+
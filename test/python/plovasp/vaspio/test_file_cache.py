@@ -0,0 +1,102 @@
+r"""
+Tests for the file cache used by the parsers from module 'vaspio'
+"""
+import os
+import shutil
+import tempfile
+import rpath
+_rpath = os.path.dirname(rpath.__file__) + '/'
+
+import mytest
+import numpy as np
+from triqs_dft_tools.converters.plovasp import vaspio
+from triqs_dft_tools.converters.plovasp.vaspio import Eigenval
+
+################################################################################
+#
+# TestFileCache
+#
+################################################################################
+class TestFileCache(mytest.MyTestCase):
+    """
+    Function:
+
+    def _read_bytes(filename, file_cache)
+
+    Scenarios:
+    - repeated reads are served from the cache
+    - file is read again if its size changes
+    - file is read again if its modification time changes
+    - parsers share the cache
+
+    """
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, 'EIGENVAL')
+        shutil.copy(_rpath + 'EIGENVAL.example', self.filename)
+        self.file_cache = {}
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, data, mtime=None):
+        """
+        Overwrites the file and optionally sets its modification time.
+        """
+        with open(self.filename, 'wb') as f:
+            f.write(data)
+        if mtime is not None:
+            os.utime(self.filename, (mtime, mtime))
+
+# Scenario 1
+    def test_hit(self):
+        raw1 = vaspio._read_bytes(self.filename, self.file_cache)
+        self.assertEqual(list(self.file_cache), [self.filename])
+
+# Same size and modification time: the file itself is not read
+        mtime = os.path.getmtime(self.filename)
+        self.write(raw1.upper(), mtime)
+        raw2 = vaspio._read_bytes(self.filename, self.file_cache)
+        self.assertIs(raw2, raw1)
+
+# Without a cache the file is always read
+        self.assertEqual(vaspio._read_bytes(self.filename), raw1.upper())
+
+# Scenario 2
+    def test_size(self):
+        raw1 = vaspio._read_bytes(self.filename, self.file_cache)
+        mtime = os.path.getmtime(self.filename)
+        self.write(raw1 + b'\n', mtime)
+
+        raw2 = vaspio._read_bytes(self.filename, self.file_cache)
+        self.assertEqual(raw2, raw1 + b'\n')
+        self.assertIs(vaspio._read_bytes(self.filename, self.file_cache), raw2)
+
+# Scenario 3
+    def test_mtime(self):
+        raw1 = vaspio._read_bytes(self.filename, self.file_cache)
+        mtime = os.path.getmtime(self.filename)
+        self.write(raw1.upper(), mtime + 10)
+
+        raw2 = vaspio._read_bytes(self.filename, self.file_cache)
+        self.assertEqual(raw2, raw1.upper())
+
+# Scenario 4
+    def test_parsers(self):
+        eigenval1 = Eigenval()
+        eigenval1.from_file(vasp_dir=self.tmp_dir, file_cache=self.file_cache)
+        self.assertEqual(list(self.file_cache), [self.filename])
+
+# A change that keeps size and modification time is not seen through the cache
+        raw = vaspio._read_bytes(self.filename)
+        mtime = os.path.getmtime(self.filename)
+        self.write(raw.replace(b'-30.901243', b'-99.999999'), mtime)
+
+        eigenval2 = Eigenval()
+        eigenval2.from_file(vasp_dir=self.tmp_dir, file_cache=self.file_cache)
+        self.assertTrue(np.array_equal(eigenval2.eigs, eigenval1.eigs))
+
+        eigenval3 = Eigenval()
+        eigenval3.from_file(vasp_dir=self.tmp_dir)
+        self.assertFalse(np.array_equal(eigenval3.eigs, eigenval1.eigs))
+
@@ -23,6 +23,7 @@ class TestIbzkpt(mytest.MyTestCase):
     Scenarios:
     - full IBZKPT file with tetrahedra
     - partial IBZKPT file with k-points only
+    - IBZKPT file with an incomplete tetrahedra block
 
     """
 # Scenario 1
@@ -58,4 +59,11 @@ class TestIbzkpt(mytest.MyTestCase):
         expected = _rpath + 'IBZKPT.notet.out'
         self.assertFileEqual(testout, expected)
 
+# Scenario 3
+    def test_shorttet(self):
+        ibz_file = 'IBZKPT.shorttet'
+        kpoints = Kpoints()
+        kpoints.from_file(vasp_dir=_rpath, ibz_filename=ibz_file)
 
+        self.assertEqual(kpoints.ntet, 0)
+        self.assertEqual(kpoints.nktot, 10)
@@ -0,0 +1,283 @@
+r"""
+Tests for the number parsers used by 'Plocar' and 'Eigenval' from module 'vaspio'
+"""
+import os
+import shutil
+import tempfile
+import rpath
+_rpath = os.path.dirname(rpath.__file__) + '/'
+
+import mytest
+import numpy as np
+from triqs_dft_tools.converters.plovasp import vaspio
+from triqs_dft_tools.converters.plovasp.vaspio import Plocar, Eigenval
+
+def scan(s):
+    """
+    Parses the first number of string 's' with '_scan_float()'.
+    """
+    buf = np.frombuffer(s.encode(), dtype=np.uint8)
+    return vaspio._scan_float(buf, 0)
+
+################################################################################
+#
+# TestScanFloat
+#
+################################################################################
+class TestScanFloat(mytest.MyTestCase):
+    """
+    Function:
+
+    def _scan_float(buf, pos)
+
+    Scenarios:
+    - numbers in the formats written by VASP
+    - numbers that cannot be converted exactly
+    - tokens that are not numbers
+    - end of data
+    - random numbers compared to 'float()'
+
+    """
+    def assertScanExact(self, s):
+        x, pos = scan(s)
+        self.assertEqual(pos, len(s.rstrip()), s)
+        self.assertEqual(repr(float(x)), repr(float(s)), s)
+
+# Scenario 1
+    def test_formats(self):
+        for s in ['1', '1.0', '-30.901243', '0.8000000E-02', '+2.5', '.5', '5.',
+                  '1.5E+03', '-0.7629e+1', '0.0', '-0.0', '0.0000000E+00',
+                  '123456789012345', '1.000000000000000000000', '1e22', '-1e-22',
+                  '900719925474099', '90071992547409900', '4.5e+22 ']:
+            self.assertScanExact(s)
+
+# Whitespace is skipped
+        x, pos = scan(' \n\t 3 ')
+        self.assertEqual((x, pos), (3.0, 5))
+
+# Scenario 2
+    def test_inexact(self):
+        for s in ['1.2345678901234567', '9007199254740992', '-0.5551115E-16', '1e23', '4.9e-324',
+                  '1.7976931348623157e308']:
+            x, pos = scan(s)
+            self.assertEqual(pos, -2, s)
+
+# Negative positions are passed on
+        buf = np.frombuffer(b'1.0', dtype=np.uint8)
+        self.assertEqual(vaspio._scan_float(buf, -2)[1], -2)
+
+# Scenario 3
+    def test_not_number(self):
+        for s in ['orbital', 'x 1.0', 'NaN', '-inf', '- ', '.', '*****', '1.5D+03',
+                  '1.0E', '1.0x', '1.0-2.0', '1.0E+2.0']:
+            x, pos = scan(s)
+            self.assertEqual(pos, -2, s)
+
+# Scenario 4
+    def test_end(self):
+        for s in ['', '   ', ' \n ']:
+            x, pos = scan(s)
+            self.assertEqual(pos, -1, s)
+
+# Scenario 5
+    def test_random(self):
+        rng = np.random.RandomState(1234)
+        values = rng.standard_normal(2000) * 10.0**rng.randint(-30, 30, 2000)
+        nexact = 0
+        for fmt in ['%.7E', '%.10f', '%.15g', '%.17g', '%.20e']:
+            for v in values:
+                s = fmt%(v)
+                x, pos = scan(s)
+                if pos == -2:
+                    continue
+                nexact += 1
+                self.assertEqual(pos, len(s), s)
+                self.assertEqual(repr(float(x)), repr(float(s)), s)
+        self.assertTrue(nexact > 0)
+
+################################################################################
+#
+# TestCountTokens
+#
+################################################################################
+class TestCountTokens(mytest.MyTestCase):
+    """
+    Function:
+
+    def _count_tokens(buf, starts, chunk_size)
+
+    Scenarios:
+    - token counts agree with 'str.split()' for any chunk size
+
+    """
+# Scenario 1
+    def test_chunks(self):
+        with open(_rpath + 'EIGENVAL.mixed', 'rb') as f:
+            raw = f.read()
+        raw += b'\n\t last  line'
+        buf = np.frombuffer(raw, dtype=np.uint8)
+        starts = vaspio._line_starts(buf)
+        expected = [len(raw[starts[i]:starts[i + 1]].split()) for i in range(starts.size - 1)]
+        for chunk_size in [1, 7, 100, 1 << 20]:
+            ntok = vaspio._count_tokens(buf, starts, chunk_size)
+            self.assertEqual(ntok.tolist(), expected)
+            ntok = vaspio._count_tokens(buf, starts[5:20], chunk_size)
+            self.assertEqual(ntok.tolist(), expected[5:19])
+
+################################################################################
+#
+# TestCompiledParsers
+#
+################################################################################
+class TestCompiledParsers(mytest.MyTestCase):
+    """
+    Function:
+
+    def Plocar.locproj_parser(locproj_filename)
+    def Eigenval.from_file(vasp_dir, eig_filename)
+
+    Scenarios:
+    - LOCPROJ gives identical data with and without Numba
+    - LOCPROJ with numbers not converted by the compiled parser
+    - EIGENVAL gives identical data with and without Numba
+    - EIGENVAL with numbers not converted by the compiled parser
+    - errors raised by the LOCPROJ parser are passed on
+    - LOCPROJ with a token that is not a plain number
+    - EIGENVAL with a word on a band line is rejected with and without Numba
+
+    """
+    def run_both(self, read):
+        """
+        Calls 'read()' with the compiled parsers (if Numba is available)
+        and with the NumPy parsers.
+        """
+        has_numba = vaspio._has_numba
+        try:
+            vaspio._has_numba = has_numba
+            res_numba = read()
+            vaspio._has_numba = False
+            res_numpy = read()
+        finally:
+            vaspio._has_numba = has_numba
+        return res_numba, res_numpy
+
+    def assertArraysIdentical(self, arr1, arr2, msg=None):
+        self.assertEqual(arr1.shape, arr2.shape, msg)
+        self.assertTrue(np.array_equal(arr1, arr2), msg)
+
+    def assertEigenvalIdentical(self, eig1, eig2):
+        for attr in ['kpts', 'kwghts', 'eigs', 'ferw']:
+            self.assertArraysIdentical(getattr(eig1, attr), getattr(eig2, attr), attr)
+
+    def read_eigenval(self, filename):
+        eigenval = Eigenval()
+        eigenval.from_file(vasp_dir=_rpath, eig_filename=filename)
+        return eigenval
+
+# Scenario 1
+    def test_locproj(self):
+        def read():
+            plocar = Plocar()
+            proj_params, plo = plocar.locproj_parser(locproj_filename=_rpath + 'LOCPROJ.example')
+            return plocar, proj_params, plo
+
+        (plocar1, params1, plo1), (plocar2, params2, plo2) = self.run_both(read)
+        self.assertArraysIdentical(plo1, plo2)
+        self.assertArraysIdentical(plocar1.eigs, plocar2.eigs)
+        self.assertArraysIdentical(plocar1.ferw, plocar2.ferw)
+        self.assertEqual(list(params1), list(params2))
+
+# Scenario 2
+    def test_locproj_inexact(self):
+        with open(_rpath + 'LOCPROJ.example', 'rb') as f:
+            data = f.read()
+        data = data.replace(b'-31.0588926734 ', b'-31.05889267341234567 ', 1)
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            locproj_filename = os.path.join(tmp_dir, 'LOCPROJ')
+            with open(locproj_filename, 'wb') as f:
+                f.write(data)
+
+            def read():
+                plocar = Plocar()
+                proj_params, plo = plocar.locproj_parser(locproj_filename=locproj_filename)
+                return plocar, plo
+
+            (plocar1, plo1), (plocar2, plo2) = self.run_both(read)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertArraysIdentical(plo1, plo2)
+        self.assertArraysIdentical(plocar1.eigs, plocar2.eigs)
+        self.assertEqual(plocar1.eigs[0, 0, 0], -31.05889267341234567)
+
+# Scenario 3
+    def test_eigenval(self):
+        eig1, eig2 = self.run_both(lambda: self.read_eigenval('EIGENVAL.example'))
+        self.assertEigenvalIdentical(eig1, eig2)
+
+# Scenario 4
+    def test_eigenval_inexact(self):
+        filename = 'EIGENVAL.inexact'
+        eig1, eig2 = self.run_both(lambda: self.read_eigenval(filename))
+        self.assertEigenvalIdentical(eig1, eig2)
+        self.assertEqual(eig1.eigs[0, 0, 0], -30.901243123456789)
+        self.assertEqual(eig1.eigs[0, 1, 0], -3.0901242e-30)
+
+# Scenario 5
+    def test_locproj_error(self):
+        def failing_parser(*args):
+            raise RuntimeError("parser failed")
+
+        has_numba, parser = vaspio._has_numba, vaspio._parse_locproj_body
+        try:
+            vaspio._has_numba = True
+            vaspio._parse_locproj_body = failing_parser
+            with self.assertRaisesRegex(RuntimeError, "parser failed"):
+                Plocar().locproj_parser(locproj_filename=_rpath + 'LOCPROJ.example')
+        finally:
+            vaspio._has_numba, vaspio._parse_locproj_body = has_numba, parser
+
+    def write_tmp(self, filename, data):
+        """
+        Writes 'data' to 'filename' in a temporary directory removed
+        at the end of the test.
+        """
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        filename = os.path.join(tmp_dir, filename)
+        with open(filename, 'wb') as f:
+            f.write(data)
+        return filename
+
+# Scenario 6
+    def test_locproj_nan(self):
+        with open(_rpath + 'LOCPROJ.example', 'rb') as f:
+            data = f.read()
+        line = b'     1        0.0000000000       -0.0000000000'
+        self.assertIn(line, data)
+        locproj_filename = self.write_tmp('LOCPROJ', data.replace(line, line.replace(b'0.0000000000 ', b'NaN ', 1), 1))
+
+        def read():
+            plocar = Plocar()
+            proj_params, plo = plocar.locproj_parser(locproj_filename=locproj_filename)
+            return plo
+
+        plo1, plo2 = self.run_both(read)
+        self.assertTrue(np.array_equal(plo1, plo2, equal_nan=True))
+        self.assertTrue(np.isnan(plo1[0, 0, 0, 0].real))
+
+# Scenario 7
+    def test_eigenval_word(self):
+        with open(_rpath + 'EIGENVAL.example', 'rb') as f:
+            lines = f.read().split(b'\n')
+        lines[8] = b'x ' + lines[8]
+        eig_filename = self.write_tmp('EIGENVAL', b'\n'.join(lines))
+
+        def read():
+            eigenval = Eigenval()
+            with self.assertRaisesRegex(AssertionError, "EIGENVAL file is incorrect"):
+                eigenval.from_file(vasp_dir=os.path.dirname(eig_filename))
+
+        self.run_both(read)
+
@@ -0,0 +1,176 @@
+r"""
+Tests for class 'Plocar' from module 'vaspio'
+"""
+import gc
+import os
+import shutil
+import tempfile
+import warnings
+import rpath
+_rpath = os.path.dirname(rpath.__file__) + '/'
+
+import mytest
+import numpy as np
+from triqs_dft_tools.converters.plovasp.vaspio import Plocar, ProjParams
+
+################################################################################
+#
+# TestProjParams
+#
+################################################################################
+class TestProjParams(mytest.MyTestCase):
+    """
+    Function:
+
+    def Plocar.locproj_parser(locproj_filename)
+
+    Scenarios:
+    - projector parameters behave as the list of dictionaries
+    - changes to the parameter arrays are seen by the dictionaries
+    - parameters are created from a list of dictionaries
+
+    """
+    def setUp(self):
+        self.plocar = Plocar()
+        self.proj_params, self.plo = self.plocar.locproj_parser(
+            locproj_filename=_rpath + 'LOCPROJ.example')
+        self.expected = [{'label': label, 'isite': 1, 'l': 2, 'm': m} for m, label in
+                         enumerate(['dxy', 'dyz', 'dz2', 'dxz', 'dx2-y2'])]
+
+# Scenario 1
+    def test_as_list(self):
+        self.assertEqual(list(self.proj_params), self.expected)
+        self.assertEqual(self.proj_params.as_dicts(), self.expected)
+        self.assertEqual(len(self.proj_params), 5)
+        self.assertEqual(self.proj_params[-1], self.expected[-1])
+        self.assertEqual(self.proj_params[1:3], self.expected[1:3])
+
+# Scenario 2
+    def test_update(self):
+        self.assertEqual(list(self.proj_params), self.expected)
+        self.proj_params.isite_arr[:] = 2
+        self.expected = [dict(par, isite=2) for par in self.expected]
+        self.assertEqual(list(self.proj_params), self.expected)
+        self.assertEqual(self.proj_params[0], self.expected[0])
+
+# Scenario 3
+    def test_from_dicts(self):
+        proj_params = ProjParams.from_dicts(self.expected)
+        self.assertEqual(list(proj_params), self.expected)
+        self.assertEqual(proj_params.m_arr.tolist(), list(range(5)))
+
+################################################################################
+#
+# TestPlocarCache
+#
+################################################################################
+class TestPlocarCache(mytest.MyTestCase):
+    """
+    Function:
+
+    def Plocar.from_file(vasp_dir, use_cache)
+
+    Scenarios:
+    - data restored from the cache is identical to the parsed data
+    - cache is ignored and rewritten if LOCPROJ changes
+    - damaged cache is ignored
+    - single-precision cache is ignored if double precision is requested
+    - real type of projectors is rejected
+
+    """
+    def setUp(self):
+        self.vasp_dir = tempfile.mkdtemp()
+        self.locproj = os.path.join(self.vasp_dir, 'LOCPROJ')
+        self.cache = self.locproj + '.npz'
+        shutil.copy(_rpath + 'LOCPROJ.example', self.locproj)
+
+    def tearDown(self):
+        shutil.rmtree(self.vasp_dir)
+
+    def read_plocar(self, **kwargs):
+        """
+        Reads LOCPROJ with the cache enabled and counts calls to the parser.
+        """
+        plocar = Plocar()
+        plocar.nparse = 0
+        parser = plocar.locproj_parser
+        def counting_parser(*args, **kw):
+            plocar.nparse += 1
+            return parser(*args, **kw)
+        plocar.locproj_parser = counting_parser
+        plocar.from_file(vasp_dir=self.vasp_dir, use_cache=True, **kwargs)
+        return plocar
+
+    def assertPlocarEqual(self, plocar1, plocar2):
+        for attr in ['plo', 'eigs', 'ferw']:
+            arr1, arr2 = getattr(plocar1, attr), getattr(plocar2, attr)
+            self.assertEqual(arr1.dtype, arr2.dtype)
+            self.assertTrue(np.array_equal(arr1, arr2), attr)
+        for attr in ['ncdij', 'nspin', 'nspin_band', 'nband', 'nc_flag', 'efermi']:
+            self.assertEqual(getattr(plocar1, attr), getattr(plocar2, attr))
+        self.assertEqual(list(plocar1.proj_params), list(plocar2.proj_params))
+
+# Scenario 1
+    def test_roundtrip(self):
+        parsed = self.read_plocar()
+        self.assertEqual(parsed.nparse, 1)
+        self.assertTrue(os.path.isfile(self.cache))
+
+        cached = self.read_plocar()
+        self.assertEqual(cached.nparse, 0)
+        self.assertPlocarEqual(cached, parsed)
+
+# Scenario 2
+    def test_invalidate(self):
+        parsed = self.read_plocar()
+        mtime = os.path.getmtime(self.locproj)
+        os.utime(self.locproj, (mtime + 10, mtime + 10))
+
+        reparsed = self.read_plocar()
+        self.assertEqual(reparsed.nparse, 1)
+        self.assertPlocarEqual(reparsed, parsed)
+
+# The cache is updated for the new version of the file
+        cached = self.read_plocar()
+        self.assertEqual(cached.nparse, 0)
+
+# Scenario 3
+    def test_damaged(self):
+        parsed = self.read_plocar()
+        with open(self.cache, 'rb') as f:
+            data = f.read()
+        with open(self.cache, 'wb') as f:
+            f.write(data[:len(data) // 2])
+
+# The damaged cache file must not be left open
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', ResourceWarning)
+            reparsed = self.read_plocar()
+            gc.collect()
+        self.assertEqual([w for w in caught if w.category is ResourceWarning], [])
+        self.assertEqual(reparsed.nparse, 1)
+        self.assertPlocarEqual(reparsed, parsed)
+
+# Scenario 4
+    def test_precision(self):
+        cached = self.read_plocar(plo_dtype=np.complex64)
+        self.assertEqual(cached.plo.dtype, np.complex64)
+
+        reparsed = self.read_plocar(plo_dtype=np.complex128)
+        self.assertEqual(reparsed.nparse, 1)
+        self.assertEqual(reparsed.plo.dtype, np.complex128)
+
+# A double-precision cache can be used for single-precision projectors
+        cached = self.read_plocar(plo_dtype=np.complex64)
+        self.assertEqual(cached.nparse, 0)
+        self.assertEqual(cached.plo.dtype, np.complex64)
+
+# Scenario 5
+    def test_real_dtype(self):
+        err_mess = "plo_dtype must be a complex type"
+        with self.assertRaisesRegex(ValueError, err_mess):
+            Plocar().locproj_parser(locproj_filename=self.locproj, plo_dtype=np.float64)
+        with self.assertRaisesRegex(ValueError, err_mess):
+            self.read_plocar(plo_dtype=np.float64)
+        self.assertFalse(os.path.isfile(self.cache))
+